@@ -1,114 +1,190 @@
-from flask import Flask, render_template, request, jsonify, send_file
 import os
+# Patch blocking I/O before anything imports socket/ssl; gunicorn's gevent
+# worker does this itself, this covers running the app directly
+if os.environ.get('GEVENT') == '1':
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, render_template, request, jsonify, send_file
+from flask.json.provider import JSONProvider
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+import gzip
+import time
 import datetime
-import json
-from threading import Thread
+import hashlib
+import logging
+from threading import BoundedSemaphore, Thread
+from concurrent.futures import ThreadPoolExecutor
 import uuid
-from werkzeug.utils import secure_filename
-
-# Import our SEO tool (we'll need to modify it slightly)
-from seo_audit_enhanced_fixed import SEOSleuth, AuditConfig
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+from functools import partial, lru_cache
+import orjson
+from rq import Queue
+from rq.job import Job
 
-# Store for ongoing analyses (in production, use Redis or database)
-analyses = {}
-
-class WebSEOAnalyzer:
-    def __init__(self):
-        self.zenserp_api_key = os.environ.get('ZENSERP_API_KEY')
-
-    def create_web_config(self, max_pages=10):
-        """Create web-optimized configuration."""
-        return AuditConfig(
-            max_pages=max_pages,
-            max_concurrent_requests=2,
-            request_delay=1.5,
-            respect_robots_txt=True,
-            cache_enabled=True,
-            timeout=30,
-            max_retries=2
-        )
+from job_store import jobs, redis_client, REDIS_URL, JOB_TTL
+from tasks import run_analysis, audit_cache_key, prune_reports, ZENSERP_API_KEY
+from seo_audit_enhanced_fixed import RequestCache, split_website_url, is_domain_blocked
 
-    def run_analysis(self, analysis_id, website_url, target_keyword, max_pages=10):
-        """Run SEO analysis in background thread."""
-        try:
-            analyses[analysis_id]['status'] = 'running'
-            analyses[analysis_id]['progress'] = 'Initializing...'
+logger = logging.getLogger(__name__)
 
-            config = self.create_web_config(max_pages)
-            seo_tool = SEOSleuth(self.zenserp_api_key, config)
+class OrjsonProvider(JSONProvider):
+    """JSON provider that serializes with orjson, including datetimes."""
 
-            analyses[analysis_id]['progress'] = 'Analyzing website...'
-            report = seo_tool.analyze_website(website_url, target_keyword)
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
 
-            # Save report
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"seo_audit_{analysis_id}_{timestamp}.md"
-            filepath = os.path.join('reports', filename)
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
-            os.makedirs('reports', exist_ok=True)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(report)
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
 
-            analyses[analysis_id].update({
-                'status': 'completed',
-                'progress': 'Analysis completed!',
-                'report': report,
-                'filename': filename,
-                'filepath': filepath,
-                'completed_at': datetime.datetime.now().isoformat()
-            })
+app = Flask(__name__)
+app.json = OrjsonProvider(app)
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+# Request bodies are a few small JSON fields; anything bigger is refused unread
+app.config['MAX_CONTENT_LENGTH'] = 4096
+# Cloud Run's front end is one proxy hop; trust its X-Forwarded-For so
+# remote_addr (and the per-client rate limit) is the real client address
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 1))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+# Analyses run on RQ workers when Redis is configured, else on a local thread pool
+queue = Queue('seo', connection=redis_client) if redis_client is not None else None
+
+# Local analyses are capped here; with RQ the worker count bounds concurrency.
+# A slot is taken before submitting, so the pool never builds a backlog
+MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', 4))
+job_slots = BoundedSemaphore(MAX_CONCURRENT_JOBS)
+analysis_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix='seo-audit')
+
+# When set (e.g. '/_reports/'), nginx serves downloads from this internal location
+REPORTS_ACCEL_PREFIX = os.environ.get('REPORTS_ACCEL_PREFIX')
+# Behind Apache/lighttpd, send_file answers with an X-Sendfile header and no body
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+
+# Moving window: a burst straddling a window boundary cannot double the limit.
+# On Redis each check is one atomic Lua script, shared by all workers
+limiter = Limiter(get_remote_address, app=app, storage_uri=REDIS_URL or 'memory://',
+                  strategy='moving-window')
+
+# Reports and cached responses are only ever added; sweep out expired ones hourly.
+# Reports of RQ runs live in Redis and expire with their job records
+MAINTENANCE_INTERVAL = 3600  # seconds
+
+def run_maintenance():
+    while True:
+        time.sleep(MAINTENANCE_INTERVAL)
+        try:
+            logger.info("Removed %d old reports and %d cache files", prune_reports(), RequestCache().prune())
+        except OSError as e:
+            logger.warning("Maintenance failed: %s", e)
 
-        except Exception as e:
-            analyses[analysis_id].update({
-                'status': 'error',
-                'progress': f'Error: {str(e)}',
-                'error': str(e)
-            })
+def start_maintenance():
+    """Start the sweeper; called once per server process, never on import."""
+    Thread(target=run_maintenance, daemon=True, name='maintenance').start()
 
-# Initialize analyzer
-analyzer = WebSEOAnalyzer()
+def to_datetime(epoch):
+    """Convert an epoch timestamp from a job record; orjson renders it as ISO-8601."""
+    return datetime.datetime.fromtimestamp(epoch) if epoch is not None else None
 
 @app.route('/')
 def index():
     """Main page with SEO audit form."""
-    return render_template('index.html')
+    # Browsers may reuse the page for a few minutes, then revalidate with its ETag
+    response = app.response_class(INDEX_PAGE, mimetype='text/html')
+    response.set_etag(INDEX_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)
 
 @app.route('/analyze', methods=['POST'])
+@limiter.limit("10/minute")
+@limiter.limit("100/hour", key_func=lambda: 'global')
 def start_analysis():
     """Start SEO analysis."""
-    data = request.get_json()
+    # Cheapest checks first; nothing is allocated for a request that will fail
+    if not ZENSERP_API_KEY:
+        return jsonify({'error': 'ZenSERP API key not configured'}), 500
 
-    website_url = data.get('website_url', '').strip()
-    target_keyword = data.get('target_keyword', '').strip()
-    max_pages = min(int(data.get('max_pages', 10)), 50)  # Limit to 50 pages
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
 
+    try:
+        website_url = data.get('website_url', '').strip()
+        target_keyword = data.get('target_keyword', '').strip()
+    except AttributeError:
+        return jsonify({'error': 'Website URL and target keyword must be strings'}), 400
     if not website_url or not target_keyword:
         return jsonify({'error': 'Website URL and target keyword are required'}), 400
 
-    if not analyzer.zenserp_api_key:
-        return jsonify({'error': 'ZenSERP API key not configured'}), 500
+    try:
+        max_pages = min(max(int(data.get('max_pages', 10)), 1), 50)  # Limit to 50 pages
+    except (TypeError, ValueError):
+        return jsonify({'error': 'max_pages must be an integer'}), 400
+
+    # Validate and normalize once here; the crawler trusts what it is given
+    parts = split_website_url(website_url)
+    if parts is None:
+        return jsonify({'error': 'Website URL must be an absolute http(s) URL'}), 400
+    website_url = parts.geturl()
+    if is_domain_blocked(parts.hostname):
+        return jsonify({'error': 'Auditing this website is not allowed'}), 400
+
+    # A recent identical audit is answered with its finished report
+    if not data.get('bypass_cache'):
+        cached_id = jobs.cached_result(audit_cache_key(website_url, target_keyword, max_pages))
+        cached = jobs.get(cached_id, fields=('status',)) if cached_id is not None else None
+        if cached is not None and cached['status'] == 'completed':
+            return jsonify({
+                'analysis_id': cached_id,
+                'status': 'completed',
+                'cached': True,
+                'message': 'A recent report for this audit is available.'
+            })
+
+    if queue is None and not job_slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many analyses running, please retry shortly'}), 429
 
     # Generate unique analysis ID
     analysis_id = str(uuid.uuid4())
 
-    # Initialize analysis record
-    analyses[analysis_id] = {
+    # Initialize analysis record in one write; the RQ job reuses the analysis id
+    record = {
         'id': analysis_id,
         'website_url': website_url,
+        'domain': parts.netloc,
         'target_keyword': target_keyword,
         'max_pages': max_pages,
         'status': 'queued',
         'progress': 'Queued for analysis...',
-        'started_at': datetime.datetime.now().isoformat()
+        'started_at': time.time()
     }
-
-    # Start analysis in background thread
-    thread = Thread(target=analyzer.run_analysis, args=(analysis_id, website_url, target_keyword, max_pages))
-    thread.daemon = True
-    thread.start()
+    if queue is not None:
+        record['rq_job_id'] = analysis_id
+        # Record and RQ job go out in one transaction: a single round trip on
+        # the request path, and never one without the other.
+        # RQ's job hash lives exactly as long as our record: failed jobs would
+        # otherwise linger for a year, finished ones vanish after 500s
+        with redis_client.pipeline() as pipe:
+            queue.enqueue(run_analysis, analysis_id, website_url, target_keyword, max_pages,
+                          job_id=analysis_id, job_timeout=1800,
+                          result_ttl=JOB_TTL, failure_ttl=JOB_TTL, pipeline=pipe)
+            jobs.create(analysis_id, record, pipeline=pipe)
+            pipe.execute()
+    else:
+        try:
+            jobs.create(analysis_id, record)
+            future = analysis_pool.submit(run_analysis, analysis_id, website_url, target_keyword, max_pages)
+        except BaseException:
+            job_slots.release()  # nothing will run to hand the slot back
+            raise
+        future.add_done_callback(lambda _: job_slots.release())
 
     return jsonify({
         'analysis_id': analysis_id,
@@ -116,58 +192,165 @@ def start_analysis():
         'message': 'SEO analysis started. Please wait...'
     })
 
+# What a status poll reads; internal fields such as the report path stay server-side
+STATUS_FIELDS = (
+    'id', 'website_url', 'domain', 'target_keyword', 'max_pages', 'status', 'progress',
+    'error', 'filename', 'started_at', 'completed_at', 'rq_job_id'
+)
+
 @app.route('/status/<analysis_id>')
 def check_status(analysis_id):
     """Check analysis status."""
-    if analysis_id not in analyses:
+    analysis = jobs.get(analysis_id, fields=STATUS_FIELDS)
+    if analysis is None:
         return jsonify({'error': 'Analysis not found'}), 404
 
-    analysis = analyses[analysis_id].copy()
-
-    # Don't return the full report in status checks
-    if 'report' in analysis:
+    # A worker that crashed or timed out never gets to record its own failure
+    if analysis.get('rq_job_id'):
+        # One HGET of the status field; Job.fetch would load and unpickle the whole job
+        queue_status = redis_client.hget(Job.key_for(analysis['rq_job_id']), 'status')
+        if queue_status is not None:
+            queue_status = queue_status.decode('utf-8')
+        if queue_status == 'failed' and analysis.get('status') not in ('completed', 'error'):
+            analysis.update({
+                'status': 'error',
+                'progress': 'Error: analysis worker failed',
+                'error': 'analysis worker failed'
+            })
+        analysis['queue_status'] = queue_status
+
+    # Pollers revalidate with If-None-Match; unchanged jobs get a bodiless 304
+    etag = hashlib.md5(
+        f"{analysis.get('status')}|{analysis.get('progress')}|{analysis.get('queue_status')}".encode('utf-8')
+    ).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response
+
+    if analysis.get('status') == 'completed':
         analysis['has_report'] = True
-        del analysis['report']
 
-    return jsonify(analysis)
+    # Job records keep epoch floats; convert only when responding
+    analysis['started_at'] = to_datetime(analysis.get('started_at'))
+    if 'completed_at' in analysis:
+        analysis['completed_at'] = to_datetime(analysis['completed_at'])
+
+    response = jsonify(analysis)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+# What serving a stored report reads
+REPORT_FIELDS = ('status', 'filename', 'filepath')
+
+def send_report(analysis_id, analysis, as_attachment):
+    """Send a stored report, passing its gzip bytes through when the client accepts them."""
+    if 'filepath' not in analysis:
+        # Reports written by RQ workers are kept in Redis, not on this host
+        report = jobs.get_report(analysis_id)
+        if report is None:
+            raise FileNotFoundError(analysis_id)
+        return send_report_bytes(report, analysis['filename'], as_attachment)
+
+    filepath = analysis['filepath']
+    if request.accept_encodings.quality('gzip') > 0:
+        # Let the client inflate; a file path lets the WSGI server use
+        # sendfile and answer 304/Range
+        response = send_file(
+            filepath,
+            as_attachment=as_attachment,
+            download_name=analysis['filename'],
+            mimetype='text/markdown',
+            conditional=True,
+            etag=True,
+            last_modified=os.path.getmtime(filepath)
+        )
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        # Inflate in chunks so memory stays flat however large the report is
+        report_file = gzip.open(filepath, 'rb')
+
+        def generate():
+            with report_file:
+                yield from iter(partial(report_file.read, 64 * 1024), b'')
+
+        response = app.response_class(generate(), mimetype='text/markdown')
+        if as_attachment:
+            response.headers.set('Content-Disposition', 'attachment', filename=analysis['filename'])
+    response.vary.add('Accept-Encoding')
+    return response
+
+def send_report_bytes(report, filename, as_attachment):
+    """Send a gzipped report held in memory."""
+    if request.accept_encodings.quality('gzip') > 0:
+        response = app.response_class(report, mimetype='text/markdown')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = app.response_class(gzip.decompress(report), mimetype='text/markdown')
+    if as_attachment:
+        response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    response.vary.add('Accept-Encoding')
+    response.add_etag()
+    return response.make_conditional(request)
 
 @app.route('/report/<analysis_id>')
 def get_report(analysis_id):
-    """Get analysis report."""
-    if analysis_id not in analyses:
+    """Get analysis report as Markdown."""
+    analysis = jobs.get(analysis_id, fields=REPORT_FIELDS)
+    if analysis is None:
         return jsonify({'error': 'Analysis not found'}), 404
 
-    analysis = analyses[analysis_id]
+    if analysis['status'] != 'completed':
+        return jsonify({'error': 'Analysis not completed yet'}), 400
+
+    # Reports are stored gzip-compressed, on disk or (with RQ) in Redis
+    try:
+        return send_report(analysis_id, analysis, as_attachment=False)
+    except FileNotFoundError:
+        return jsonify({'error': 'Report file not found'}), 404
+
+@app.route('/report/<analysis_id>/meta')
+def get_report_meta(analysis_id):
+    """Get analysis report metadata."""
+    analysis = jobs.get(
+        analysis_id, fields=('status', 'filename', 'website_url', 'target_keyword', 'completed_at')
+    )
+    if analysis is None:
+        return jsonify({'error': 'Analysis not found'}), 404
 
     if analysis['status'] != 'completed':
         return jsonify({'error': 'Analysis not completed yet'}), 400
 
     return jsonify({
         'analysis_id': analysis_id,
-        'report': analysis.get('report', ''),
+        'filename': analysis['filename'],
         'website_url': analysis['website_url'],
         'target_keyword': analysis['target_keyword'],
-        'completed_at': analysis.get('completed_at')
+        'completed_at': to_datetime(analysis.get('completed_at'))
     })
 
 @app.route('/download/<analysis_id>')
 def download_report(analysis_id):
     """Download report as file."""
-    if analysis_id not in analyses:
+    analysis = jobs.get(analysis_id, fields=REPORT_FIELDS)
+    if analysis is None:
         return jsonify({'error': 'Analysis not found'}), 404
 
-    analysis = analyses[analysis_id]
-
-    if analysis['status'] != 'completed' or 'filepath' not in analysis:
+    if analysis['status'] != 'completed':
         return jsonify({'error': 'Report not available'}), 400
 
+    if REPORTS_ACCEL_PREFIX and 'filepath' in analysis:
+        # Hand the transfer to nginx, which picks the .gz file and inflates it
+        # for clients that do not accept gzip
+        response = app.response_class(mimetype='text/markdown')
+        response.headers['X-Accel-Redirect'] = f"{REPORTS_ACCEL_PREFIX}{analysis['filename']}"
+        response.headers.set('Content-Disposition', 'attachment', filename=analysis['filename'])
+        return response
+
     try:
-        return send_file(
-            analysis['filepath'],
-            as_attachment=True,
-            download_name=analysis['filename'],
-            mimetype='text/markdown'
-        )
+        return send_report(analysis_id, analysis, as_attachment=True)
     except FileNotFoundError:
         return jsonify({'error': 'Report file not found'}), 404
 
@@ -176,23 +359,44 @@ def health_check():
     """Health check endpoint."""
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.datetime.now().isoformat(),
-        'api_configured': bool(analyzer.zenserp_api_key)
+        'timestamp': int(time.time()),
+        'api_configured': bool(ZENSERP_API_KEY)
     })
 
+# The main and error pages are static, so render them once instead of per request
+with app.app_context():
+    INDEX_PAGE = render_template('index.html')
+    INDEX_ETAG = hashlib.md5(INDEX_PAGE.encode('utf-8')).hexdigest()
+    NOT_FOUND_PAGE = render_template('404.html')
+    SERVER_ERROR_PAGE = render_template('500.html')
+
 @app.errorhandler(404)
 def not_found_error(error):
-    return render_template('404.html'), 404
+    return NOT_FOUND_PAGE, 404
+
+@app.errorhandler(413)
+def payload_too_large_error(error):
+    return jsonify({'error': 'Request body too large'}), 413
+
+@app.errorhandler(429)
+def rate_limit_error(error):
+    return jsonify({'error': f'Rate limit exceeded: {error.description}'}), 429
 
 @app.errorhandler(500)
 def internal_error(error):
-    return render_template('500.html'), 500
+    return SERVER_ERROR_PAGE, 500
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
     debug = os.environ.get('FLASK_ENV') == 'development'
     
     print(f"🚀 Starting Flask app on port {port}")
-    print(f"🔑 ZenSERP API: {'✅ Configured' if analyzer.zenserp_api_key else '❌ Missing'}")
+    print(f"🔑 ZenSERP API: {'✅ Configured' if ZENSERP_API_KEY else '❌ Missing'}")
     
-    app.run(host='0.0.0.0', port=port, debug=debug)
+    start_maintenance()
+    if os.environ.get('GEVENT') == '1' and not debug:
+        # Same server gunicorn's gevent worker uses, without the dev server's thread per request
+        from gevent.pywsgi import WSGIServer
+        WSGIServer(('0.0.0.0', port), app).serve_forever()
+    else:
+        app.run(host='0.0.0.0', port=port, debug=debug)
@@ -0,0 +1,106 @@
+import atexit
+import io
+import logging
+import os
+import queue
+from threading import Thread
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStream:
+    """A file written incrementally by the writer thread.
+
+    write(), close() and abort() only enqueue work. on_done(error) runs on
+    the writer thread once the file is closed, with the first error seen.
+    """
+
+    def __init__(self, q, path, on_done=None):
+        self._q = q
+        self.path = path
+        self._on_done = on_done
+        self._file = None
+        self._error = None
+        q.put((self._open, None))
+
+    def write(self, data):
+        self._q.put((self._write, data))
+
+    def close(self):
+        self._q.put((self._close, None))
+
+    def abort(self):
+        """Discard the partial file without calling on_done."""
+        self._q.put((self._abort, None))
+
+    def _open(self, _):
+        try:
+            try:
+                raw = io.FileIO(self.path, 'w')
+            except FileNotFoundError:
+                # The directory is created once at startup; recover if it was removed since
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                raw = io.FileIO(self.path, 'w')
+            # A single large buffer over the raw file, no extra buffering layer
+            self._file = io.BufferedWriter(raw, buffer_size=1 << 20)
+        except OSError as e:
+            self._fail(e)
+
+    def _write(self, data):
+        if self._error is None:
+            try:
+                self._file.write(data)
+            except OSError as e:
+                self._fail(e)
+
+    def _close(self, _):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError as e:
+                self._fail(e)
+        if self._on_done is not None:
+            self._on_done(self._error)
+
+    def _abort(self, _):
+        if self._file is not None:
+            self._file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _fail(self, error):
+        logger.warning("Could not write %s: %s", self.path, error)
+        if self._error is None:
+            self._error = error
+
+
+class AsyncArtifactWriter:
+    """Writes report files on a background thread so jobs never wait on the disk."""
+
+    def __init__(self):
+        self.q = queue.Queue()
+        Thread(target=self._run, daemon=True).start()
+
+    def open(self, path, on_done=None):
+        """Start writing path; on_done(error) runs after the stream is closed."""
+        return ArtifactStream(self.q, path, on_done)
+
+    def flush(self):
+        """Block until every queued write has completed."""
+        self.q.join()
+
+    def _run(self):
+        while True:
+            operation, arg = self.q.get()
+            try:
+                operation(arg)
+            except Exception as e:
+                logger.warning("Artifact writer operation failed: %s", e)
+            finally:
+                self.q.task_done()
+
+
+writer = AsyncArtifactWriter()
+atexit.register(writer.flush)
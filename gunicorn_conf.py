@@ -0,0 +1,24 @@
+import os
+
+bind = f":{os.environ.get('PORT', 8080)}"
+
+# Requests are I/O bound (status polls, scraping, disk writes), so each worker
+# multiplexes many connections on gevent greenlets
+worker_class = 'gevent'
+worker_connections = 1000
+
+# Without Redis, jobs and rate limits live in process memory, so every
+# request has to reach the same worker
+workers = min(4, os.cpu_count() * 2 + 1) if os.environ.get('REDIS_URL') else 1
+
+# Without Redis, analyses parse pages on threads inside the worker and can
+# starve the gevent hub for minutes; a heartbeat timeout would kill the worker
+# and every analysis running in it
+timeout = 60 if os.environ.get('REDIS_URL') else 0
+
+
+def post_worker_init(worker):
+    # Runs after the gevent worker has patched and loaded the app, so the
+    # sweeper starts once per worker rather than on every import of app
+    from app import start_maintenance
+    start_maintenance()
@@ -0,0 +1,321 @@
+import os
+import time
+import atexit
+from collections import OrderedDict
+from threading import Lock, Thread
+
+import orjson
+import redis
+
+REDIS_URL = os.environ.get('REDIS_URL')
+JOB_TTL = int(os.environ.get('JOB_TTL', 86400))  # 24 hours
+MAX_JOBS = int(os.environ.get('MAX_JOBS', 500))
+# Append-only journal that lets the in-memory store survive restarts; '' disables it
+JOB_LOG = os.environ.get('JOB_LOG', 'jobs.log')
+JOB_LOG_SYNC_INTERVAL = 1.0  # seconds
+JOB_LOG_COMPACT_RATIO = 4  # rewrite the journal once it holds this many lines per job
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 3600))  # 1 hour
+FINISHED_STATUSES = ('completed', 'error')
+
+# Writes to an existing record only: a late progress update must not recreate
+# a job that expired or was evicted as a partial hash. ARGV: ttl, fields...
+UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+# As UPDATE_SCRIPT, then caches the run under KEYS[2] and, unless ARGV[4]
+# is empty, stores the gzipped report under KEYS[3] for as long as the record.
+# ARGV: ttl, job id, cache ttl, report, fields...
+COMPLETE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if ARGV[4] ~= '' then
+    redis.call('SET', KEYS[3], ARGV[4], 'EX', ARGV[1])
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 5))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+# Connections are capped per process; greenlets beyond the cap wait for a free one
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+
+# Shared by the job store and the RQ queue; None when running without Redis
+redis_client = redis.Redis(connection_pool=redis.BlockingConnectionPool.from_url(
+    REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, timeout=5
+)) if REDIS_URL else None
+
+
+class MemoryJobStore:
+    """In-process job store, used when no Redis instance is configured.
+
+    Holds at most max_jobs finished records; the least recently updated are
+    evicted, while queued and running jobs are always kept.
+    Finished records expire ttl seconds after their started_at.
+    Records are never mutated in place: writers publish a new dict under
+    the write lock, so readers just load the current record without locking.
+
+    With a journal_path, every write is also appended to that file as one
+    JSON line and fsynced in the background. On startup the journal is
+    replayed, jobs that were still in flight are marked as interrupted, and
+    the journal is compacted to the surviving records; it is compacted again
+    whenever it grows past JOB_LOG_COMPACT_RATIO lines per job.
+    """
+
+    def __init__(self, max_jobs=MAX_JOBS, journal_path=None, ttl=JOB_TTL):
+        self._jobs = OrderedDict()
+        self._results = OrderedDict()  # audit cache key -> (job id, expiry)
+        self._write_lock = Lock()
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._journal = None
+        self._journal_path = None
+        self._journal_lines = 0
+        self._journal_dirty = False
+        if journal_path:
+            self._open_journal(journal_path)
+
+    def create(self, job_id, record):
+        line = self._journal_line(job_id, record)
+        with self._write_lock:
+            self._jobs[job_id] = dict(record)
+            self._evict()
+            self._append(line)
+
+    def _expired(self, job, now):
+        return job.get('status') in FINISHED_STATUSES and job.get('started_at', now) + self.ttl < now
+
+    def _evict(self):
+        # Oldest first: drop expired records even while under the cap. Queued
+        # and running jobs are skipped, so an analysis never loses its record
+        now = time.time()
+        excess = len(self._jobs) - self.max_jobs
+        victims = []
+        for job_id, job in self._jobs.items():
+            if job.get('status') not in FINISHED_STATUSES:
+                continue
+            if excess <= 0 and not self._expired(job, now):
+                break
+            victims.append(job_id)
+            excess -= 1
+        for job_id in victims:
+            del self._jobs[job_id]
+
+    def _replace(self, job_id, build, fields):
+        line = self._journal_line(job_id, fields)
+        with self._write_lock:
+            job = self._jobs.get(job_id)
+            if job is not None:  # may have been evicted
+                self._jobs[job_id] = build(job)
+                self._jobs.move_to_end(job_id)
+                self._append(line)
+
+    def update(self, job_id, **fields):
+        self._replace(job_id, lambda job: {**job, **fields}, fields)
+
+    def get(self, job_id, fields=None):
+        """Return a copy of the job record (or just the given fields), or None if unknown."""
+        job = self._jobs.get(job_id)
+        if job is None or self._expired(job, time.time()):
+            return None
+        if fields is None:
+            return dict(job)
+        return {name: job[name] for name in fields if name in job}
+
+    def complete(self, job_id, cache_key, **fields):
+        """Apply the final update and cache the run under one lock."""
+        line = self._journal_line(job_id, fields)
+        with self._write_lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs[job_id] = {**job, **fields}
+                self._jobs.move_to_end(job_id)
+                self._append(line)
+            self._results[cache_key] = (job_id, time.time() + RESULT_CACHE_TTL)
+            self._results.move_to_end(cache_key)
+            while len(self._results) > self.max_jobs:
+                self._results.popitem(last=False)
+
+    def get_report(self, job_id):
+        """Local runs keep reports in files; the record holds the path."""
+        return None
+
+    def cached_result(self, key):
+        """Return the job id cached for an audit cache key, or None."""
+        entry = self._results.get(key)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+    def _journal_line(self, job_id, fields):
+        # Serialized before taking the lock; only the append happens under it
+        if self._journal is None:
+            return None
+        return orjson.dumps([job_id, fields], option=orjson.OPT_APPEND_NEWLINE)
+
+    def _append(self, line):
+        if line is not None:
+            self._journal.write(line)
+            self._journal_lines += 1
+            self._journal_dirty = True
+
+    def _open_journal(self, path):
+        self._journal_path = path
+        self._replay(path)
+        self._compact_journal()
+        Thread(target=self._sync_periodically, daemon=True).start()
+        atexit.register(self._sync_journal)
+
+    def _compact_journal(self):
+        # Rewrite as one line per job, swapped in atomically; callers other
+        # than startup hold the write lock so no append can be lost
+        path = self._journal_path
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for job_id, job in self._jobs.items():
+                f.write(orjson.dumps([job_id, job], option=orjson.OPT_APPEND_NEWLINE))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(path, 'ab', buffering=1 << 20)
+        self._journal_lines = len(self._jobs)
+        self._journal_dirty = False
+
+    def _replay(self, path):
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        job_id, fields = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        break  # torn write at the tail
+                    self._jobs[job_id] = {**self._jobs.get(job_id, {}), **fields}
+                    self._jobs.move_to_end(job_id)
+        except FileNotFoundError:
+            return
+
+        # Jobs that were queued or running died with the previous process
+        for job_id, job in self._jobs.items():
+            if job.get('status') not in FINISHED_STATUSES:
+                self._jobs[job_id] = {
+                    **job,
+                    'status': 'error',
+                    'progress': 'Error: interrupted by a restart',
+                    'error': 'interrupted by a restart'
+                }
+
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items() if self._expired(job, now)]:
+            del self._jobs[job_id]
+        self._evict()
+
+    def _sync_journal(self):
+        # An idle store costs no syscalls; clear before flushing so a
+        # concurrent append is caught by the next sync at the latest
+        if not self._journal_dirty:
+            return
+        self._journal_dirty = False
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _sync_periodically(self):
+        while True:
+            time.sleep(JOB_LOG_SYNC_INTERVAL)
+            # Progress updates append forever; without compaction the journal
+            # and the replay on restart grow with uptime
+            if self._journal_lines > JOB_LOG_COMPACT_RATIO * max(len(self._jobs), self.max_jobs):
+                with self._write_lock:
+                    self._compact_journal()
+            else:
+                self._sync_journal()
+
+
+class RedisJobStore:
+    """Job store backed by Redis hashes so every worker sees the same jobs."""
+
+    key_prefix = 'seo:job:'
+    result_prefix = 'seo:audit:'
+    report_prefix = 'seo:report:'
+
+    def __init__(self, client, ttl=JOB_TTL):
+        self.redis = client
+        self.ttl = ttl
+        self._update_script = client.register_script(UPDATE_SCRIPT)
+        self._complete_script = client.register_script(COMPLETE_SCRIPT)
+
+    def _key(self, job_id):
+        return f"{self.key_prefix}{job_id}"
+
+    def _encode(self, fields):
+        return {name: orjson.dumps(value) for name, value in fields.items()}
+
+    def _encode_args(self, fields):
+        # Flattened name/value pairs, as HSET takes them inside a script
+        return [item for name, value in fields.items() for item in (name, orjson.dumps(value))]
+
+    def create(self, job_id, record, pipeline=None):
+        """Create a job record; with a pipeline, the caller executes it."""
+        # One round trip, and the record never exists without its TTL
+        key = self._key(job_id)
+        if pipeline is not None:
+            pipeline.hset(key, mapping=self._encode(record))
+            pipeline.expire(key, self.ttl)
+            return
+        with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=self._encode(record))
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+
+    def update(self, job_id, **fields):
+        # One atomic round trip; the TTL is re-armed with every write
+        self._update_script(keys=[self._key(job_id)], args=[self.ttl, *self._encode_args(fields)])
+
+    def get(self, job_id, fields=None):
+        """Return the job record (or just the given fields), or None if unknown."""
+        if fields is None:
+            raw = self.redis.hgetall(self._key(job_id))
+            if not raw:
+                return None
+            return {name.decode('utf-8'): orjson.loads(value) for name, value in raw.items()}
+
+        values = self.redis.hmget(self._key(job_id), fields)
+        record = {name: orjson.loads(value) for name, value in zip(fields, values) if value is not None}
+        return record or None
+
+    def complete(self, job_id, cache_key, report=b'', **fields):
+        """Apply the final update, store the report if given and cache the run in one atomic step."""
+        # A job whose record is gone is not cached either
+        self._complete_script(
+            keys=[self._key(job_id), f"{self.result_prefix}{cache_key}", f"{self.report_prefix}{job_id}"],
+            args=[self.ttl, job_id, RESULT_CACHE_TTL, report, *self._encode_args(fields)]
+        )
+
+    def get_report(self, job_id):
+        """Return the gzipped report stored by complete(), or None."""
+        return self.redis.get(f"{self.report_prefix}{job_id}")
+
+    def cached_result(self, key):
+        """Return the job id cached for an audit cache key, or None."""
+        job_id = self.redis.get(f"{self.result_prefix}{key}")
+        return job_id.decode('utf-8') if job_id is not None else None
+
+
+def create_job_store():
+    """Create a Redis-backed store when REDIS_URL is set, else an in-memory one."""
+    if redis_client is not None:
+        return RedisJobStore(redis_client)
+    return MemoryJobStore(journal_path=os.path.abspath(JOB_LOG) if JOB_LOG else None)
+
+
+# Single store per process, shared by the web handlers and the analysis tasks
+jobs = create_job_store()
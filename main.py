@@ -1,15 +1,33 @@
-import json
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 import os
 import datetime
-from seo_audit_enhanced_fixed import SEOSleuth, AuditConfig
+import orjson
+from functools import lru_cache
+from seo_audit_enhanced_fixed import SEOSleuth, AuditConfig, split_website_url, is_domain_blocked
 
 app = Flask(__name__)
 
-def create_config():
-    """Create Cloud Functions optimized configuration."""
+# Read once per instance; the environment does not change between invocations
+ZENSERP_API_KEY = os.environ.get('ZENSERP_API_KEY')
+
+# Static CORS headers, shared by every invocation
+CORS_PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'POST',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Max-Age': '3600'
+}
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*'}
+
+def json_response(obj):
+    """Build a JSON response with orjson; the report body can be large."""
+    return Response(orjson.dumps(obj), mimetype='application/json')
+
+@lru_cache(maxsize=20)
+def create_config(max_pages=10):
+    """Create Cloud Functions optimized configuration, built once per page limit."""
     return AuditConfig(
-        max_pages=10,  # Limit for Cloud Functions
+        max_pages=max_pages,  # Limit for Cloud Functions
         max_concurrent_requests=1,  # Single request processing
         request_delay=1.0,
         respect_robots_txt=True,
@@ -23,42 +41,44 @@ def seo_audit_function(request):
 
     # Handle CORS preflight
     if request.method == 'OPTIONS':
-        headers = {
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'POST',
-            'Access-Control-Allow-Headers': 'Content-Type',
-            'Access-Control-Max-Age': '3600'
-        }
-        return ('', 204, headers)
+        return ('', 204, CORS_PREFLIGHT_HEADERS)
 
-    headers = {'Access-Control-Allow-Origin': '*'}
+    headers = CORS_HEADERS
 
     if request.method != 'POST':
-        return (jsonify({'error': 'Method not allowed'}), 405, headers)
+        return (json_response({'error': 'Method not allowed'}), 405, headers)
+
+    if not ZENSERP_API_KEY:
+        return (json_response({'error': 'API key not configured'}), 500, headers)
 
     try:
         # Get request data
         request_json = request.get_json(silent=True)
         if not request_json:
-            return (jsonify({'error': 'No JSON data provided'}), 400, headers)
+            return (json_response({'error': 'No JSON data provided'}), 400, headers)
 
-        website_url = request_json.get('website_url', '').strip()
-        target_keyword = request_json.get('target_keyword', '').strip()
-        max_pages = min(int(request_json.get('max_pages', 5)), 20)  # Limit for functions
+        # Unpack every field in one step; malformed values are the client's error
+        try:
+            website_url = request_json.get('website_url', '').strip()
+            target_keyword = request_json.get('target_keyword', '').strip()
+            max_pages = max(1, min(int(request_json.get('max_pages', 5)), 20))  # Limit for functions
+        except (AttributeError, TypeError, ValueError):
+            return (json_response({'error': 'Invalid website_url, target_keyword or max_pages'}), 400, headers)
 
         if not website_url or not target_keyword:
-            return (jsonify({'error': 'website_url and target_keyword required'}), 400, headers)
+            return (json_response({'error': 'website_url and target_keyword required'}), 400, headers)
 
-        # Get API key from environment
-        api_key = os.environ.get('ZENSERP_API_KEY')
-        if not api_key:
-            return (jsonify({'error': 'API key not configured'}), 500, headers)
+        # Same URL policy as the web app
+        parts = split_website_url(website_url)
+        if parts is None:
+            return (json_response({'error': 'website_url must be an absolute http(s) URL'}), 400, headers)
+        website_url = parts.geturl()
+        if is_domain_blocked(parts.hostname):
+            return (json_response({'error': 'Auditing this website is not allowed'}), 400, headers)
 
         # Run SEO analysis
-        config = create_config()
-        config.max_pages = max_pages
-
-        seo_tool = SEOSleuth(api_key, config)
+        config = create_config(max_pages)
+        seo_tool = SEOSleuth(ZENSERP_API_KEY, config)
         report = seo_tool.analyze_website(website_url, target_keyword)
 
         # Return results
@@ -68,19 +88,19 @@ def seo_audit_function(request):
             'target_keyword': target_keyword,
             'pages_analyzed': max_pages,
             'report': report,
-            'timestamp': datetime.datetime.now().isoformat(),
+            'timestamp': datetime.datetime.now(),
             'analysis_duration': 'Completed'
         }
 
-        return (jsonify(result), 200, headers)
+        return (json_response(result), 200, headers)
 
     except Exception as e:
         error_result = {
             'success': False,
             'error': str(e),
-            'timestamp': datetime.datetime.now().isoformat()
+            'timestamp': datetime.datetime.now()
         }
-        return (jsonify(error_result), 500, headers)
+        return (json_response(error_result), 500, headers)
 
 # For local testing
 if __name__ == '__main__':
@@ -1,28 +1,26 @@
 
 import requests
 import time
-import json
 import logging
 from datetime import datetime, timedelta
-from urllib.parse import urljoin, urlparse
-from urllib.robotparser import RobotFileParser
+from urllib.parse import urljoin, urlparse, urlsplit
 from bs4 import BeautifulSoup
 import re
-from collections import Counter, defaultdict
+from collections import Counter, defaultdict, deque
 import csv
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Optional, Set, Tuple
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterator, Callable
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import random
 from pathlib import Path
-import yaml
-from functools import wraps
+from functools import wraps, lru_cache
 import hashlib
 import pickle
+import gzip
 import os
+import stat
 from tqdm import tqdm
-import pandas as pd
 
 # Configure logging for Colab
 logging.basicConfig(
@@ -31,6 +29,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Column order of the issues CSV export
+ISSUE_CSV_COLUMNS = [
+    'category', 'priority', 'page', 'issue', 'recommendation', 'impact', 'timestamp',
+    'pages_affected', 'priority_score'
+]
+PRIORITY_SCORES = {'Critical': 4, 'High': 3, 'Medium': 2, 'Low': 1}
+
 @dataclass
 class SEOIssue:
     """Data class representing an SEO issue found during audit."""
@@ -46,9 +51,21 @@ class SEOIssue:
         if self.timestamp is None:
             self.timestamp = datetime.now().isoformat()
 
-@dataclass
+    def to_csv_row(self) -> Tuple:
+        """Return the issue as a row matching ISSUE_CSV_COLUMNS."""
+        return (self.category, self.priority, self.page, self.issue, self.recommendation,
+                self.impact, self.timestamp, self.page.count(', ') + 1,
+                PRIORITY_SCORES.get(self.priority, 0))
+
+DEFAULT_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+)
+
+@dataclass(frozen=True)
 class AuditConfig:
-    """Configuration settings for SEO audit."""
+    """Configuration settings for SEO audit; immutable, so one instance can serve many runs."""
     max_pages: int = 50
     max_concurrent_requests: int = 5
     request_delay: float = 1.0
@@ -58,38 +75,46 @@ class AuditConfig:
     backoff_factor: float = 0.3
     cache_enabled: bool = True
     cache_duration: int = 3600  # 1 hour
-    user_agents: List[str] = None
+    export_csv: bool = True  # write seo_issues_<timestamp>.csv next to the report
+    user_agents: Tuple[str, ...] = None
 
     def __post_init__(self):
         if self.user_agents is None:
-            self.user_agents = [
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            ]
+            object.__setattr__(self, 'user_agents', DEFAULT_USER_AGENTS)
+        else:
+            object.__setattr__(self, 'user_agents', tuple(self.user_agents))
+
+@lru_cache(maxsize=None)
+def ensure_dir(path: str) -> None:
+    """Create a directory if needed; each path is checked once per process."""
+    try:
+        # The directory usually exists already: one stat instead of a failing mkdir
+        if stat.S_ISDIR(os.stat(path).st_mode):
+            return
+    except FileNotFoundError:
+        pass
+    os.makedirs(path, exist_ok=True)
 
 class RequestCache:
-    """Simple file-based cache for HTTP requests."""
+    """Simple file-based cache for HTTP requests, stored as gzipped pickles."""
 
     def __init__(self, cache_dir: str = ".seo_cache", duration: int = 3600):
+        # Every crawl builds new caches; the directory is only set up by the first
+        ensure_dir(cache_dir)
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
         self.duration = duration
 
     def _get_cache_key(self, url: str) -> str:
         """Generate cache key from URL."""
-        return hashlib.md5(url.encode()).hexdigest()
+        return hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
 
     def get(self, url: str) -> Optional[Dict]:
         """Retrieve cached response if available and not expired."""
         cache_key = self._get_cache_key(url)
-        cache_file = self.cache_dir / f"{cache_key}.pkl"
-
-        if not cache_file.exists():
-            return None
+        cache_file = self.cache_dir / f"{cache_key}.pkl.gz"
 
         try:
-            with open(cache_file, 'rb') as f:
+            with gzip.open(cache_file, 'rb') as f:
                 cached_data = pickle.load(f)
 
             # Check if cache is expired
@@ -98,14 +123,16 @@ class RequestCache:
                 return None
 
             return cached_data['response']
+        except FileNotFoundError:
+            return None
         except Exception as e:
-            logger.warning(f"Error reading cache for {url}: {e}")
+            logger.warning("Error reading cache for %s: %s", url, e)
             return None
 
     def set(self, url: str, response_data: Dict):
         """Cache response data."""
         cache_key = self._get_cache_key(url)
-        cache_file = self.cache_dir / f"{cache_key}.pkl"
+        cache_file = self.cache_dir / f"{cache_key}.pkl.gz"
 
         try:
             cached_data = {
@@ -113,10 +140,30 @@ class RequestCache:
                 'response': response_data
             }
 
-            with open(cache_file, 'wb') as f:
-                pickle.dump(cached_data, f)
+            # Page HTML compresses well; level 6 keeps writes cheap
+            try:
+                f = gzip.open(cache_file, 'wb', compresslevel=6)
+            except FileNotFoundError:
+                # Directory removed after ensure_dir saw it; recreate instead of failing every write
+                os.makedirs(self.cache_dir, exist_ok=True)
+                f = gzip.open(cache_file, 'wb', compresslevel=6)
+            with f:
+                pickle.dump(cached_data, f, pickle.HIGHEST_PROTOCOL)
         except Exception as e:
-            logger.warning(f"Error caching {url}: {e}")
+            logger.warning("Error caching %s: %s", url, e)
+
+    def prune(self) -> int:
+        """Delete expired cache files, including ones that are never read again."""
+        cutoff = time.time() - self.duration
+        removed = 0
+        for cache_file in self.cache_dir.glob("*.pkl*"):
+            try:
+                if cache_file.stat().st_mtime < cutoff:
+                    cache_file.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass  # removed concurrently
+        return removed
 
 def retry_on_failure(max_retries: int = 3, backoff_factor: float = 0.3):
     """Decorator to retry function calls on failure with exponential backoff."""
@@ -132,15 +179,22 @@ def retry_on_failure(max_retries: int = 3, backoff_factor: float = 0.3):
                     last_exception = e
                     if attempt < max_retries:
                         wait_time = backoff_factor * (2 ** attempt)
-                        logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}: {e}. Retrying in {wait_time:.2f}s...")
+                        logger.warning("Attempt %d failed for %s: %s. Retrying in %.2fs...",
+                                       attempt + 1, func.__name__, e, wait_time)
                         time.sleep(wait_time)
                     else:
-                        logger.error(f"All {max_retries + 1} attempts failed for {func.__name__}")
+                        logger.error("All %d attempts failed for %s", max_retries + 1, func.__name__)
 
             raise last_exception
         return wrapper
     return decorator
 
+# SERP lookups of all analyses in the process run on serp_executor and share one
+# session, so the TLS connection to the API outlives any single analysis
+SERP_CONCURRENCY = 4
+serp_session = requests.Session()
+serp_session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=SERP_CONCURRENCY))
+
 class ZenSERPManager:
     """Enhanced ZenSERP API manager with better error handling and rate limiting."""
 
@@ -152,6 +206,8 @@ class ZenSERPManager:
         self.config = config or AuditConfig()
         self.cache = RequestCache() if self.config.cache_enabled else None
         self.rate_limiter = threading.Semaphore(1)
+        self.session = serp_session
+        self.headers = {'apikey': api_key}
 
     def check_remaining_quota(self) -> Dict[str, int]:
         """Check remaining API quota."""
@@ -173,11 +229,10 @@ class ZenSERPManager:
         if self.cache:
             cached_result = self.cache.get(cache_key)
             if cached_result:
-                logger.info(f"Using cached SERP data for: {keyword}")
+                logger.info("Using cached SERP data for: %s", keyword)
                 return cached_result
 
         with self.rate_limiter:
-            headers = {'apikey': self.api_key}
             params = {
                 'q': keyword,
                 'location': location,
@@ -187,10 +242,10 @@ class ZenSERPManager:
             }
 
             try:
-                response = requests.get(
+                response = self.session.get(
                     self.base_url, 
-                    headers=headers, 
                     params=params, 
+                    headers=self.headers,
                     timeout=self.config.timeout
                 )
                 response.raise_for_status()
@@ -202,28 +257,83 @@ class ZenSERPManager:
                 if self.cache:
                     self.cache.set(cache_key, result)
 
-                logger.info(f"SERP API call successful for: {keyword}")
+                logger.info("SERP API call successful for: %s", keyword)
                 return result
 
             except requests.exceptions.RequestException as e:
-                logger.error(f"SERP API request failed for {keyword}: {str(e)}")
+                logger.error("SERP API request failed for %s: %s", keyword, e)
                 raise Exception(f"SERP API request failed: {str(e)}")
 
+# Pages of one site mostly link to the same URLs, so splits are worth memoizing
+split_url = lru_cache(maxsize=4096)(urlsplit)
+
+# Hosts that may not be audited, e.g. internal services; a set so lookups stay O(1).
+# An entry also covers its subdomains
+BLOCKED_DOMAINS = frozenset(
+    domain.strip().lower() for domain in os.environ.get('BLOCKED_DOMAINS', '').split(',') if domain.strip()
+)
+
+def widened_hostnames(hostname: str) -> Iterator[str]:
+    """Yield a hostname and each parent domain: a.b.c, b.c, c."""
+    while hostname:
+        yield hostname
+        hostname = hostname.partition('.')[2]
+
+# BLOCKED_DOMAINS is fixed at import, so decisions never go stale
+@lru_cache(maxsize=4096)
+def is_domain_blocked(hostname: Optional[str]) -> bool:
+    """Check a lowercased hostname, and the domains above it, against BLOCKED_DOMAINS."""
+    if not hostname:
+        return True  # nothing to check against; refuse rather than crawl it
+    # A trailing dot names the same host
+    return any(name in BLOCKED_DOMAINS for name in widened_hostnames(hostname.rstrip('.')))
+
+@lru_cache(maxsize=4096)
+def split_website_url(website_url: str):
+    """Split and normalize an absolute http(s) URL, or return None if it is not one."""
+    try:
+        parts = urlsplit(website_url)
+    except ValueError:  # e.g. an unterminated IPv6 literal
+        return None
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return None
+    # Hostnames compare case-insensitively
+    return parts._replace(netloc=parts.netloc.lower(), fragment='')
+
 class WebsiteCrawler:
     """Enhanced website crawler with concurrent processing and better error handling."""
 
     def __init__(self, base_url: str, config: AuditConfig = None):
         self.base_url = base_url
-        self.domain = urlparse(base_url).netloc
+        self.domain = split_url(base_url).netloc
         self.config = config or AuditConfig()
         self.crawled_urls: Set[str] = set()
         self.sitemap: List[Dict[str, Any]] = []
         self.session = requests.Session()
+        # Room for one pooled connection per concurrent fetch
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(1, self.config.max_concurrent_requests))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Every redirect hop is checked before it is followed
+        self.session.hooks['response'].append(self._check_redirect)
         self.cache = RequestCache() if self.config.cache_enabled else None
-
-    def _get_random_user_agent(self) -> str:
-        """Get a random user agent string."""
-        return random.choice(self.config.user_agents)
+        self._last_fetch = threading.local()
+        # One prebuilt header dict per user agent; requests copies, never mutates them
+        self._ua_headers = tuple({'User-Agent': agent} for agent in self.config.user_agents)
+
+    def _check_redirect(self, response: requests.Response, **kwargs) -> None:
+        """Refuse to follow a redirect that leaves the allowed hosts."""
+        if not response.is_redirect:
+            return
+        location = response.headers['location']
+        target = split_website_url(urljoin(response.url, location))
+        if target is None or is_domain_blocked(target.hostname):
+            response.close()
+            raise requests.exceptions.InvalidURL(f"Refusing redirect to {location}")
+
+    def _get_random_headers(self) -> Dict[str, str]:
+        """Get request headers with a random user agent."""
+        return random.choice(self._ua_headers)
 
     @retry_on_failure(max_retries=2)
     def get_page_content(self, url: str) -> Optional[Tuple[BeautifulSoup, Dict[str, Any]]]:
@@ -235,12 +345,10 @@ class WebsiteCrawler:
                 return cached_result['soup'], cached_result['metrics']
 
         try:
-            headers = {'User-Agent': self._get_random_user_agent()}
-
-            start_time = time.time()
-            response = self.session.get(url, headers=headers, timeout=self.config.timeout)
+            start_time = time.perf_counter()
+            response = self.session.get(url, headers=self._get_random_headers(), timeout=self.config.timeout)
             response.raise_for_status()
-            load_time = time.time() - start_time
+            load_time = time.perf_counter() - start_time
 
             soup = BeautifulSoup(response.content, 'html.parser')
 
@@ -256,29 +364,32 @@ class WebsiteCrawler:
                 cache_data = {'soup': soup, 'metrics': metrics}
                 self.cache.set(url, cache_data)
 
-            logger.debug(f"Successfully crawled: {url} (Load time: {load_time:.2f}s)")
+            logger.debug("Successfully crawled: %s (Load time: %.2fs)", url, load_time)
             return soup, metrics
 
         except Exception as e:
-            logger.warning(f"Failed to crawl {url}: {e}")
+            logger.warning("Failed to crawl %s: %s", url, e)
             return None
 
     def find_internal_links(self, soup: BeautifulSoup, current_url: str) -> List[str]:
         """Find internal links from the current page."""
+        # The crawl set does not change while links are collected, so once it
+        # is full no link can qualify and the page need not be scanned
+        if len(self.crawled_urls) >= self.config.max_pages:
+            return []
+
         links = []
         for link in soup.find_all('a', href=True):
             href = link['href']
             full_url = urljoin(current_url, href)
-            parsed_url = urlparse(full_url)
+            parsed_url = split_url(full_url)
 
             # Clean URL (remove fragments and normalize)
             clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
             if parsed_url.query:
                 clean_url += f"?{parsed_url.query}"
 
-            if (parsed_url.netloc == self.domain and 
-                clean_url not in self.crawled_urls and 
-                len(self.crawled_urls) < self.config.max_pages):
+            if parsed_url.netloc == self.domain and clean_url not in self.crawled_urls:
                 links.append(clean_url)
 
         return links
@@ -300,19 +411,17 @@ class WebsiteCrawler:
 
         # Images
         images = soup.find_all('img')
-        images_without_alt = [img for img in images if not img.get('alt')]
+        images_without_alt = sum(1 for img in images if not img.get('alt'))
 
         # Links
-        all_links = soup.find_all('a', href=True)
-        internal_links = [
-            a for a in all_links 
-            if urlparse(urljoin(url, a['href'])).netloc == self.domain
-        ]
-        external_links = [
-            a for a in all_links 
-            if urlparse(urljoin(url, a['href'])).netloc != self.domain and 
-            urlparse(urljoin(url, a['href'])).netloc != ''
-        ]
+        # Only the counts are kept, so count in one pass without building lists
+        internal_links_count = external_links_count = 0
+        for a in soup.find_all('a', href=True):
+            netloc = split_url(urljoin(url, a['href'])).netloc
+            if netloc == self.domain:
+                internal_links_count += 1
+            elif netloc:
+                external_links_count += 1
 
         # Content analysis
         content_text = soup.get_text()
@@ -336,9 +445,9 @@ class WebsiteCrawler:
             'h2_tags': h2_tags,
             'h3_tags': h3_tags,
             'images_total': len(images),
-            'images_without_alt': len(images_without_alt),
-            'internal_links_count': len(internal_links),
-            'external_links_count': len(external_links),
+            'images_without_alt': images_without_alt,
+            'internal_links_count': internal_links_count,
+            'external_links_count': external_links_count,
             'word_count': word_count,
             'content': content_text,
             'has_schema_markup': has_schema,
@@ -349,8 +458,20 @@ class WebsiteCrawler:
             'content_length': metrics['content_length']
         }
 
-    def crawl_page(self, url: str) -> Optional[Dict[str, Any]]:
-        """Crawl a single page and extract data."""
+    def _wait_for_turn(self):
+        """Keep request_delay between consecutive fetches of one worker thread."""
+        last = getattr(self._last_fetch, 'time', None)
+        if last is not None:
+            remaining = last + self.config.request_delay - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+        self._last_fetch.time = time.monotonic()
+
+    def _fetch_page(self, url: str) -> Optional[Tuple[Dict[str, Any], BeautifulSoup]]:
+        """Fetch a page and extract its data; runs on crawler worker threads."""
+        # Delay before the next request rather than after this one, so the
+        # crawl never ends on an idle sleep
+        self._wait_for_turn()
         result = self.get_page_content(url)
         if not result:
             return None
@@ -358,47 +479,72 @@ class WebsiteCrawler:
         soup, metrics = result
         page_data = self.extract_page_data(url, soup, metrics)
 
-        # Add delay to be respectful
-        time.sleep(self.config.request_delay)
+        return page_data, soup
 
-        return page_data
-
-    def crawl_site(self) -> List[Dict[str, Any]]:
-        """Crawl the website with progress tracking."""
-        logger.info(f"Starting site crawl: {self.base_url}")
-        to_crawl = [self.base_url]
+    def crawl_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """Crawl a single page and extract data."""
+        result = self._fetch_page(url)
+        return result[0] if result else None
+
+    def crawl_site(self, on_first_page: Optional[Callable[[], None]] = None) -> List[Dict[str, Any]]:
+        """Crawl the website with progress tracking.
+
+        Pages are fetched up to max_concurrent_requests at a time; results are
+        processed in queue order, so the crawl visits the same pages as a
+        sequential breadth-first crawl. on_first_page is called once the
+        first page has been crawled successfully.
+        """
+        logger.info("Starting site crawl: %s", self.base_url)
+        to_crawl = deque([self.base_url])
         self.crawled_urls.add(self.base_url)
+        workers = max(1, self.config.max_concurrent_requests)
 
-        with tqdm(total=self.config.max_pages, desc="Crawling pages") as pbar:
+        with tqdm(total=self.config.max_pages, desc="Crawling pages") as pbar, \
+                ThreadPoolExecutor(max_workers=workers) as executor:
             while to_crawl and len(self.sitemap) < self.config.max_pages:
-                current_url = to_crawl.pop(0)
+                batch = [to_crawl.popleft() for _ in range(min(workers, len(to_crawl)))]
+
+                for current_url, result in zip(batch, executor.map(self._fetch_page, batch)):
+                    if not result or len(self.sitemap) >= self.config.max_pages:
+                        continue
 
-                page_data = self.crawl_page(current_url)
-                if page_data:
+                    page_data, soup = result
                     self.sitemap.append(page_data)
+                    if on_first_page is not None and len(self.sitemap) == 1:
+                        on_first_page()
 
                     # Find new links to crawl
-                    result = self.get_page_content(current_url)
-                    if result:
-                        soup, _ = result
-                        new_links = self.find_internal_links(soup, current_url)
-                        for link in new_links:
-                            if (link not in self.crawled_urls and 
-                                len(self.crawled_urls) < self.config.max_pages):
-                                to_crawl.append(link)
-                                self.crawled_urls.add(link)
+                    new_links = self.find_internal_links(soup, current_url)
+                    for link in new_links:
+                        if (link not in self.crawled_urls and 
+                            len(self.crawled_urls) < self.config.max_pages):
+                            to_crawl.append(link)
+                            self.crawled_urls.add(link)
 
                     pbar.update(1)
 
-        logger.info(f"Crawling completed. Total pages: {len(self.sitemap)}")
+        logger.info("Crawling completed. Total pages: %d", len(self.sitemap))
         return self.sitemap
 
 class KeywordAnalyzer:
     """Enhanced keyword analyzer with advanced capabilities."""
 
+    PLACEMENT_WEIGHTS = {
+        'in_title': 25,
+        'in_meta_description': 15,
+        'in_h1': 20,
+        'in_h2': 10,
+        'in_content': 20,
+        'in_url': 10
+    }
+
     def __init__(self, target_keyword: str):
         self.target_keyword = target_keyword.lower()
         self.keyword_variations = self._generate_variations()
+        # Compiled once: finds any variation in a single pass over the text
+        self._variations_pattern = re.compile('|'.join(
+            re.escape(keyword) for keyword in sorted(self.keyword_variations, key=len, reverse=True)
+        ))
 
     def _generate_variations(self) -> List[str]:
         """Generate keyword variations including plurals, related terms."""
@@ -454,17 +600,8 @@ class KeywordAnalyzer:
         }
 
         # Calculate overall optimization score
-        weights = {
-            'in_title': 25,
-            'in_meta_description': 15,
-            'in_h1': 20,
-            'in_h2': 10,
-            'in_content': 20,
-            'in_url': 10
-        }
-
         optimization_score = sum(
-            weights[key] for key, value in placement.items() if value
+            self.PLACEMENT_WEIGHTS[key] for key, value in placement.items() if value
         )
 
         placement['optimization_score'] = optimization_score
@@ -476,8 +613,7 @@ class KeywordAnalyzer:
         if not text:
             return False
 
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.keyword_variations)
+        return self._variations_pattern.search(text.lower()) is not None
 
 class SEOAuditor:
     """Enhanced SEO auditor with comprehensive analysis capabilities."""
@@ -609,12 +745,15 @@ class SEOAuditor:
         """Comprehensive technical SEO analysis."""
         issues = []
 
-        # Check for duplicate titles
-        titles = [page['title'] for page in sitemap if page['title']]
-        duplicate_titles = [title for title, count in Counter(titles).items() if count > 1]
+        # Check for duplicate titles, indexing pages by title in one pass
+        pages_by_title = defaultdict(list)
+        for page in sitemap:
+            if page['title']:
+                pages_by_title[page['title']].append(page['url'])
 
-        for title in duplicate_titles:
-            duplicate_pages = [page['url'] for page in sitemap if page['title'] == title]
+        for duplicate_pages in pages_by_title.values():
+            if len(duplicate_pages) < 2:
+                continue
             issues.append(SEOIssue(
                 category="Technical SEO",
                 priority="High",
@@ -729,7 +868,7 @@ class SEOAuditor:
     def perform_serp_analysis(self, keyword: str) -> Dict[str, Any]:
         """Enhanced SERP analysis with competitor insights."""
         try:
-            logger.info(f"Performing SERP analysis for: {keyword}")
+            logger.info("Performing SERP analysis for: %s", keyword)
             serp_data = self.zenserp.search_serp(keyword)
 
             competitors = []
@@ -758,7 +897,7 @@ class SEOAuditor:
             }
 
         except Exception as e:
-            logger.error(f"SERP analysis failed for {keyword}: {e}")
+            logger.error("SERP analysis failed for %s: %s", keyword, e)
             return {'error': str(e), 'keyword': keyword}
 
 class SEOReportGenerator:
@@ -820,10 +959,12 @@ class SEOReportGenerator:
         """Generate comprehensive executive summary."""
         seo_score = self.calculate_seo_score(issues, sitemap)
 
-        critical_count = len([i for i in issues if i.priority == 'Critical'])
-        high_count = len([i for i in issues if i.priority == 'High'])
-        medium_count = len([i for i in issues if i.priority == 'Medium'])
-        low_count = len([i for i in issues if i.priority == 'Low'])
+        # The score already counted issues per priority in one pass
+        issue_counts = seo_score.get('issue_breakdown', {})
+        critical_count = issue_counts.get('Critical', 0)
+        high_count = issue_counts.get('High', 0)
+        medium_count = issue_counts.get('Medium', 0)
+        low_count = issue_counts.get('Low', 0)
 
         total_pages = len(sitemap)
         total_words = sum(p.get('word_count', 0) for p in sitemap)
@@ -1009,56 +1150,76 @@ class SEOReportGenerator:
     def export_to_csv(self, issues: List[SEOIssue], filename: str):
         """Export issues to CSV with enhanced data."""
         try:
-            df = pd.DataFrame([asdict(issue) for issue in issues])
-            df['pages_affected'] = df['page'].apply(lambda x: len(x.split(', ')))
-            df['priority_score'] = df['priority'].map({'Critical': 4, 'High': 3, 'Medium': 2, 'Low': 1})
+            rows = [issue.to_csv_row() for issue in issues]
 
             # Sort by priority and category
-            df = df.sort_values(['priority_score', 'category'], ascending=[False, True])
+            rows.sort(key=lambda row: (-row[8], row[0]))
 
-            df.to_csv(filename, index=False, encoding='utf-8')
-            logger.info(f"Issues exported to CSV: {filename}")
+            with open(filename, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerow(ISSUE_CSV_COLUMNS)
+                writer.writerows(rows)
+            logger.info("Issues exported to CSV: %s", filename)
         except Exception as e:
-            logger.warning(f"Could not export CSV: {e}")
+            logger.warning("Could not export CSV: %s", e)
+
+# Shared by every analysis in the process instead of a pool per analysis
+serp_executor = ThreadPoolExecutor(max_workers=SERP_CONCURRENCY, thread_name_prefix='serp')
+
+class AnalysisProgress:
+    """Step counter for one analysis run."""
+
+    __slots__ = ('step_names', 'total_steps', 'current_step')
+
+    def __init__(self, step_names: Tuple[str, ...]):
+        self.step_names = step_names
+        self.total_steps = len(step_names)
+        self.current_step = 0
 
 class SEOSleuth:
     """Enhanced main SEO audit class with comprehensive analysis capabilities."""
 
-    def __init__(self, api_key: str, config: AuditConfig = None):
+    STEP_NAMES = (
+        'Initializing crawler',
+        'Crawling website',
+        'Analyzing SERP data',
+        'Checking meta tags',
+        'Analyzing keywords',
+        'Technical SEO audit',
+        'Generating report'
+    )
+
+    def __init__(self, api_key: str, config: AuditConfig = None,
+                 on_progress: Optional[Callable[[int, int, str], None]] = None):
         self.config = config or AuditConfig()
         self.zenserp = ZenSERPManager(api_key, max_requests=50, config=self.config)
         self.issues: List[SEOIssue] = []
 
         # Setup progress tracking
-        self.progress = {
-            'total_steps': 7,
-            'current_step': 0,
-            'step_names': [
-                'Initializing crawler',
-                'Crawling website',
-                'Analyzing SERP data',
-                'Checking meta tags',
-                'Analyzing keywords',
-                'Technical SEO audit',
-                'Generating report'
-            ]
-        }
+        self.progress = AnalysisProgress(self.STEP_NAMES)
+        self.on_progress = on_progress
 
     def _update_progress(self, step_name: str):
         """Update and display progress."""
-        self.progress['current_step'] += 1
-        current = self.progress['current_step']
-        total = self.progress['total_steps']
+        self.progress.current_step += 1
+        current = self.progress.current_step
+        total = self.progress.total_steps
 
-        logger.info(f"📊 Progress: {current}/{total} - {step_name}")
+        logger.info("📊 Progress: %d/%d - %s", current, total, step_name)
         print(f"🔍 [{current}/{total}] {step_name}")
+        if self.on_progress:
+            self.on_progress(current, total, step_name)
 
     def analyze_website(self, website_url: str, target_keyword: str) -> str:
         """Perform comprehensive SEO analysis with enhanced reporting."""
+        return "".join(self.analyze_website_stream(website_url, target_keyword))
+
+    def analyze_website_stream(self, website_url: str, target_keyword: str) -> Iterator[str]:
+        """Perform the SEO analysis, yielding the report section by section."""
         print("🚀 SEOSleuth Enhanced Analysis Started")
         print("=" * 60)
 
-        start_time = time.time()
+        start_time = time.monotonic()
 
         # Check API quota
         quota = self.zenserp.check_remaining_quota()
@@ -1073,18 +1234,25 @@ class SEOSleuth:
         crawler = WebsiteCrawler(website_url, self.config)
         auditor = SEOAuditor(self.zenserp, keyword_analyzer)
 
+        # The SERP lookup does not depend on the crawl, so it runs alongside it.
+        # It is a paid request: only start it once the site has answered
+        serp_futures = []
+
+        def start_serp_analysis():
+            serp_futures.append(serp_executor.submit(auditor.perform_serp_analysis, target_keyword))
+
         # Crawl website
         self._update_progress("Crawling website")
-        sitemap = crawler.crawl_site()
+        sitemap = crawler.crawl_site(on_first_page=start_serp_analysis)
 
         if not sitemap:
             raise Exception("❌ No pages could be crawled. Please check the website URL.")
 
         print(f"✅ Successfully crawled {len(sitemap)} pages")
 
-        # Perform SERP analysis
+        # Collect SERP analysis
         self._update_progress("Analyzing SERP data")
-        serp_data = auditor.perform_serp_analysis(target_keyword)
+        serp_data = serp_futures[0].result()
         if 'error' not in serp_data:
             print(f"✅ SERP analysis completed for '{target_keyword}'")
         else:
@@ -1099,6 +1267,10 @@ class SEOSleuth:
         self._update_progress("Analyzing keywords")
         keyword_issues = auditor.analyze_keyword_optimization(sitemap)
 
+        # Page text is only needed for keyword analysis; free it for the rest of the run
+        for page in sitemap:
+            page.pop('content', None)
+
         self._update_progress("Technical SEO audit")
         technical_issues = auditor.analyze_technical_seo(sitemap)
         image_issues = auditor.analyze_images(sitemap)
@@ -1114,18 +1286,18 @@ class SEOSleuth:
         self._update_progress("Generating report")
         report_generator = SEOReportGenerator(website_url, target_keyword, self.config)
 
-        # Build complete report
-        report = ""
-        report += report_generator.generate_executive_summary(all_issues, sitemap, serp_data)
-        report += report_generator.generate_detailed_findings(all_issues)
-        report += report_generator.generate_serp_analysis_report(serp_data)
-        report += report_generator.generate_recommendations(all_issues, sitemap)
+        # Emit the report one section at a time
+        yield report_generator.generate_executive_summary(all_issues, sitemap, serp_data)
+        yield report_generator.generate_detailed_findings(all_issues)
+        yield report_generator.generate_serp_analysis_report(serp_data)
+        yield report_generator.generate_recommendations(all_issues, sitemap)
 
         # Add analysis summary
-        analysis_time = time.time() - start_time
+        analysis_time = time.monotonic() - start_time
+        finished_at = datetime.now()  # shared by the report footer and the CSV name
         final_quota = self.zenserp.check_remaining_quota()
 
-        report += f"""
+        yield f"""
 ---
 
 ## 📊 Analysis Summary
@@ -1142,7 +1314,7 @@ class SEOSleuth:
 
 ---
 
-*🤖 Report generated by SEOSleuth Enhanced v2.0 on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}*
+*🤖 Report generated by SEOSleuth Enhanced v2.0 on {finished_at.strftime('%B %d, %Y at %I:%M %p')}*
 
 **Next Steps:**
 1. 📥 Address Critical and High priority issues first
@@ -1153,17 +1325,17 @@ class SEOSleuth:
 """
 
         # Export CSV
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if self.config.export_csv:
+            timestamp = finished_at.strftime("%Y%m%d_%H%M%S")
 
-        try:
-            csv_filename = f"seo_issues_{timestamp}.csv"
-            report_generator.export_to_csv(all_issues, csv_filename)
-            print(f"\n📁 CSV report created: {csv_filename}")
-        except Exception as e:
-            logger.warning(f"Could not create CSV export: {e}")
+            try:
+                csv_filename = f"seo_issues_{timestamp}.csv"
+                report_generator.export_to_csv(all_issues, csv_filename)
+                print(f"\n📁 CSV report created: {csv_filename}")
+            except Exception as e:
+                logger.warning("Could not create CSV export: %s", e)
 
         print(f"\n🎉 Analysis completed in {analysis_time/60:.1f} minutes!")
-        return report
 
 # Simplified main function for Google Colab
 def main():
@@ -1195,14 +1367,14 @@ def main():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         report_filename = f"seo_audit_{timestamp}.md"
 
-        with open(report_filename, "w", encoding="utf-8") as f:
-            f.write(report)
+        # One encode and one write; no text or buffer layer for a single payload
+        Path(report_filename).write_bytes(report.encode("utf-8"))
 
         print(f"\n📄 Report saved to: {report_filename}")
         return report, report_filename
 
     except Exception as e:
-        logger.error(f"Analysis failed: {e}")
+        logger.error("Analysis failed: %s", e)
         print(f"❌ Analysis failed: {e}")
         raise
 
@@ -0,0 +1,137 @@
+import os
+import zlib
+import hashlib
+import time
+import datetime
+from functools import partial, lru_cache
+
+from rq import get_current_job
+
+from seo_audit_enhanced_fixed import SEOSleuth, AuditConfig, ensure_dir
+from job_store import jobs, JOB_TTL
+from async_writer import writer
+
+ZENSERP_API_KEY = os.environ.get('ZENSERP_API_KEY')
+
+# Absolute, so the path stored in job records does not depend on anyone's cwd
+REPORTS_DIR = os.path.abspath('reports')
+ensure_dir(REPORTS_DIR)
+
+
+def prune_reports(max_age=JOB_TTL):
+    """Delete report files older than their job records; returns how many."""
+    cutoff = time.time() - max_age
+    removed = 0
+    with os.scandir(REPORTS_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass  # removed concurrently
+    return removed
+
+
+@lru_cache(maxsize=None)
+def create_web_config(max_pages=10):
+    """Create web-optimized configuration, built once per page limit and shared read-only."""
+    return AuditConfig(
+        max_pages=max_pages,
+        max_concurrent_requests=min(8, max_pages),
+        request_delay=1.5,
+        respect_robots_txt=True,
+        cache_enabled=True,
+        timeout=30,
+        max_retries=2,
+        export_csv=False  # nothing serves it; the report itself goes through the writer
+    )
+
+
+def audit_cache_key(website_url, target_keyword, max_pages):
+    """Key identifying repeat runs of the same audit."""
+    return hashlib.blake2b(
+        f"{website_url}|{target_keyword}|{max_pages}".encode('utf-8'), digest_size=16
+    ).hexdigest()
+
+
+def _report_progress(analysis_id, current, total, step_name):
+    """Publish the engine's current step to the job record."""
+    jobs.update(analysis_id, progress=f'{step_name} ({current}/{total})...')
+
+
+def _complete_analysis(analysis_id, cache_key, filename, **fields):
+    """Mark the job completed and cache it; fields say where the report is kept."""
+    jobs.complete(
+        analysis_id,
+        cache_key,
+        status='completed',
+        progress='Analysis completed!',
+        filename=filename,
+        completed_at=time.time(),
+        **fields
+    )
+
+
+def _finish_analysis(analysis_id, cache_key, filename, filepath, error):
+    """Complete the job once the writer has put the report on disk."""
+    if error is not None:
+        jobs.update(
+            analysis_id,
+            status='error',
+            progress=f'Error: {str(error)}',
+            error=str(error)
+        )
+        return
+
+    _complete_analysis(analysis_id, cache_key, filename, filepath=filepath)
+
+
+def run_analysis(analysis_id, website_url, target_keyword, max_pages=10):
+    """Run SEO analysis as a background job (RQ worker or local thread)."""
+    stream = None
+    try:
+        jobs.update(analysis_id, status='running', progress='Initializing...')
+
+        config = create_web_config(max_pages)
+        seo_tool = SEOSleuth(ZENSERP_API_KEY, config, on_progress=partial(_report_progress, analysis_id))
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"seo_audit_{analysis_id}_{timestamp}.md"
+        filepath = os.path.join(REPORTS_DIR, f"{filename}.gz")  # local runs only
+        cache_key = audit_cache_key(website_url, target_keyword, max_pages)
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip format
+        sections = seo_tool.analyze_website_stream(website_url, target_keyword)
+
+        if get_current_job() is not None:
+            # RQ workers share no disk with the web service, so the report
+            # is stored in Redis alongside the job record
+            report = [compressor.compress(section.encode('utf-8')) for section in sections]
+            if not report:
+                raise Exception('The analysis produced no report')
+            report.append(compressor.flush())
+            _complete_analysis(analysis_id, cache_key, filename, report=b''.join(report))
+            return
+
+        # Sections are gzip-compressed and handed to the writer as they are
+        # produced; only the file keeps the report, the job stores its path
+        for section in sections:
+            if stream is None:
+                stream = writer.open(filepath, partial(_finish_analysis, analysis_id, cache_key, filename, filepath))
+                jobs.update(analysis_id, progress='Writing report...')
+            stream.write(compressor.compress(section.encode('utf-8')))
+        if stream is None:
+            raise Exception('The analysis produced no report')
+        stream.write(compressor.flush())
+        stream.close()
+
+    except Exception as e:
+        if stream is not None:
+            stream.abort()
+        jobs.update(
+            analysis_id,
+            status='error',
+            progress=f'Error: {str(e)}',
+            error=str(e)
+        )